@@ -1,21 +1,29 @@
 from fastapi import FastAPI, Depends, Query, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import text, func, and_, or_
 from typing import Optional
+import asyncio
+import base64
 import time
 import uuid
 from datetime import datetime
 
-from core.database import get_db, engine
-from core.models import Base, UnifiedCrypto, ETLCheckpoint, ETLRun
+from core.database import get_db, init_db
+from core.models import UnifiedCrypto, ETLCheckpoint, ETLRun
+from core.config import get_settings
 from schemas.crypto import DataResponse, HealthResponse, StatsResponse, CryptoResponse, ETLRunResponse
 from core.logging_config import logger
 from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
 from fastapi.responses import Response
+from cachetools import TTLCache
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+settings = get_settings()
+
+# Schema management belongs to `python -m core.init_db` (or Alembic);
+# opt-in only for single-worker dev setups
+if settings.auto_create_tables:
+    init_db()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -33,9 +41,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Prometheus metrics
+# Prometheus metrics. Labelled by route template, not raw URL path -
+# raw paths (path params, arbitrary 404 URLs) produce unbounded series.
 request_counter = Counter('api_requests_total', 'Total API requests', ['endpoint', 'method'])
-request_duration = Histogram('api_request_duration_seconds', 'API request duration')
+request_duration = Histogram(
+    'api_request_duration_seconds', 'API request duration', ['endpoint'],
+    buckets=(0.005, 0.025, 0.1, 0.5, 2.5)
+)
 
 
 @app.middleware("http")
@@ -44,10 +56,13 @@ async def add_metrics(request, call_next):
     start_time = time.time()
     response = await call_next(request)
     duration = time.time() - start_time
-    
-    request_counter.labels(endpoint=request.url.path, method=request.method).inc()
-    request_duration.observe(duration)
-    
+
+    # Only matched routes are recorded, keeping cardinality O(routes)
+    route = request.scope.get('route')
+    if route is not None:
+        request_counter.labels(endpoint=route.path, method=request.method).inc()
+        request_duration.labels(endpoint=route.path).observe(duration)
+
     return response
 
 
@@ -74,95 +89,219 @@ async def health_check(db: Session = Depends(get_db)):
     Health check endpoint
     - Checks database connectivity
     - Reports ETL status for all sources
+    - Responses are cached briefly to absorb probe bursts
     """
-    start_time = time.time()
-    
+    async with status_cache_lock:
+        cached = status_cache.get("health")
+        if cached is not None:
+            status_cache_requests.labels(endpoint="/health", result="hit").inc()
+            return cached
+        status_cache_requests.labels(endpoint="/health", result="miss").inc()
+
+        try:
+            # Check database connectivity
+            db.execute(text("SELECT 1"))
+            db_status = "connected"
+        except Exception as e:
+            logger.error(f"Database health check failed: {str(e)}")
+            db_status = f"error: {str(e)}"
+
+        # Get ETL status for all sources with a single query
+        etl_status = {}
+        sources = ["coinpaprika", "coingecko", "csv"]
+
+        checkpoints = {
+            c.source_name: c
+            for c in db.query(ETLCheckpoint).filter(
+                ETLCheckpoint.source_name.in_(sources)
+            ).all()
+        }
+
+        for source in sources:
+            checkpoint = checkpoints.get(source)
+
+            if checkpoint:
+                etl_status[source] = {
+                    "last_run_status": checkpoint.last_run_status,
+                    "last_run_time": checkpoint.last_processed_timestamp.isoformat() if checkpoint.last_processed_timestamp else None,
+                    "records_processed": checkpoint.records_processed
+                }
+            else:
+                etl_status[source] = {
+                    "last_run_status": "never_run",
+                    "last_run_time": None,
+                    "records_processed": 0
+                }
+
+        response = HealthResponse(
+            status="healthy" if db_status == "connected" else "unhealthy",
+            database=db_status,
+            etl_status=etl_status,
+            timestamp=datetime.utcnow()
+        )
+        status_cache["health"] = response
+        return response
+
+
+# Short-lived cache of filtered counts, keyed by (source, symbol)
+count_cache = TTLCache(maxsize=512, ttl=30)
+
+# Absorb probe/scraper bursts on /health and /stats: responses are
+# cached for a few seconds and recomputed single-flight under a lock
+status_cache = TTLCache(maxsize=2, ttl=5)
+status_cache_lock = asyncio.Lock()
+status_cache_requests = Counter(
+    'api_status_cache_requests_total',
+    'Cache lookups for /health and /stats responses',
+    ['endpoint', 'result']
+)
+
+# Columns projected for /data - exactly the CryptoResponse fields
+CRYPTO_RESPONSE_COLUMNS = (
+    UnifiedCrypto.id,
+    UnifiedCrypto.coin_id,
+    UnifiedCrypto.name,
+    UnifiedCrypto.symbol,
+    UnifiedCrypto.price_usd,
+    UnifiedCrypto.market_cap_usd,
+    UnifiedCrypto.volume_24h_usd,
+    UnifiedCrypto.price_change_24h_percent,
+    UnifiedCrypto.rank,
+    UnifiedCrypto.source,
+    UnifiedCrypto.updated_at,
+)
+
+
+def get_total_count(db: Session, query, source: Optional[str], symbol: Optional[str]) -> int:
+    """
+    Resolve the total row count without an exact COUNT(*) per page.
+
+    Unfiltered requests read the planner estimate from pg_class; filtered
+    requests compute the count once and serve it from a TTL cache.
+    """
+    if source is None and symbol is None:
+        try:
+            estimate = db.execute(text(
+                "SELECT reltuples::bigint FROM pg_class WHERE relname = 'unified_crypto'"
+            )).scalar()
+            # reltuples is -1 (or 0) before the first ANALYZE - fall through
+            if estimate is not None and estimate > 0:
+                return int(estimate)
+        except Exception:
+            # Non-Postgres backend (e.g. SQLite in tests) - fall back to exact count
+            db.rollback()
+        return query.count()
+
+    cache_key = (source, symbol)
+    total = count_cache.get(cache_key)
+    if total is None:
+        total = query.count()
+        count_cache[cache_key] = total
+    return total
+
+
+def encode_cursor(updated_at: datetime, row_id: int) -> str:
+    """Encode an opaque pagination cursor from (updated_at, id)"""
+    raw = f"{updated_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Decode a pagination cursor back to (updated_at, id)"""
     try:
-        # Check database connectivity
-        db.execute(text("SELECT 1"))
-        db_status = "connected"
-    except Exception as e:
-        logger.error(f"Database health check failed: {str(e)}")
-        db_status = f"error: {str(e)}"
-    
-    # Get ETL status for all sources
-    etl_status = {}
-    sources = ["coinpaprika", "coingecko", "csv"]
-    
-    for source in sources:
-        checkpoint = db.query(ETLCheckpoint).filter(
-            ETLCheckpoint.source_name == source
-        ).first()
-        
-        if checkpoint:
-            etl_status[source] = {
-                "last_run_status": checkpoint.last_run_status,
-                "last_run_time": checkpoint.last_processed_timestamp.isoformat() if checkpoint.last_processed_timestamp else None,
-                "records_processed": checkpoint.records_processed
-            }
-        else:
-            etl_status[source] = {
-                "last_run_status": "never_run",
-                "last_run_time": None,
-                "records_processed": 0
-            }
-    
-    return HealthResponse(
-        status="healthy" if db_status == "connected" else "unhealthy",
-        database=db_status,
-        etl_status=etl_status,
-        timestamp=datetime.utcnow()
-    )
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        timestamp, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=422, detail="Invalid cursor")
 
 
 @app.get("/data", response_model=DataResponse, tags=["Data"])
 async def get_data(
-    page: int = Query(1, ge=1, description="Page number"),
+    page: int = Query(1, ge=1, description="Page number (ignored when cursor is set)"),
     page_size: int = Query(20, ge=1, le=100, description="Items per page"),
     source: Optional[str] = Query(None, description="Filter by source (coinpaprika, coingecko, csv)"),
     symbol: Optional[str] = Query(None, description="Filter by symbol"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page"),
     db: Session = Depends(get_db)
 ):
     """
     Get cryptocurrency data with pagination and filtering
-    
-    - **page**: Page number (starts at 1)
+
+    - **page**: Page number (starts at 1, offset-based fallback)
     - **page_size**: Number of items per page (max 100)
     - **source**: Filter by data source
     - **symbol**: Filter by cryptocurrency symbol
+    - **cursor**: Keyset cursor returned as `next_cursor`; constant-time deep pagination
     """
     request_id = str(uuid.uuid4())
     start_time = time.time()
-    
+
     try:
-        # Build query
-        query = db.query(UnifiedCrypto)
-        
+        # Build query over response columns only - skips ORM entity
+        # construction and fetches tuples straight off the cursor
+        query = db.query(*CRYPTO_RESPONSE_COLUMNS)
+
         # Apply filters
         if source:
             query = query.filter(UnifiedCrypto.source == source)
         if symbol:
             query = query.filter(UnifiedCrypto.symbol == symbol.upper())
-        
-        # Get total count
-        total = query.count()
-        
-        # Apply pagination
-        offset = (page - 1) * page_size
-        data = query.order_by(UnifiedCrypto.updated_at.desc()).offset(offset).limit(page_size).all()
-        
+
+        if cursor:
+            # Keyset pagination: seek past the last seen (updated_at, id).
+            # No count here - it would force a full scan on every page.
+            # Decomposed rather than a tuple_() row-value comparison:
+            # tuple_ coerces the bound values to generic types, dropping
+            # the column's SQLite microsecond-truncation variant and
+            # breaking the seek against server-default timestamps.
+            last_ts, last_id = decode_cursor(cursor)
+            query = query.filter(
+                or_(
+                    UnifiedCrypto.updated_at < last_ts,
+                    and_(
+                        UnifiedCrypto.updated_at == last_ts,
+                        UnifiedCrypto.id < last_id
+                    )
+                )
+            )
+            total = None
+            # Stream from a server-side cursor instead of buffering the page
+            data = list(query.order_by(
+                UnifiedCrypto.updated_at.desc(), UnifiedCrypto.id.desc()
+            ).limit(page_size).yield_per(page_size))
+        else:
+            # Offset-based fallback for page-numbered access
+            total = get_total_count(db, query, source, symbol)
+            offset = (page - 1) * page_size
+            data = list(query.order_by(
+                UnifiedCrypto.updated_at.desc(), UnifiedCrypto.id.desc()
+            ).offset(offset).limit(page_size).yield_per(page_size))
+
+        # Emit a cursor for the next page when this one came back full
+        next_cursor = None
+        if len(data) == page_size and data[-1].updated_at is not None:
+            next_cursor = encode_cursor(data[-1].updated_at, data[-1].id)
+
         # Calculate latency
         api_latency_ms = (time.time() - start_time) * 1000
-        
+
         return DataResponse(
-            data=[CryptoResponse.model_validate(item) for item in data],
+            # Rows already satisfy the schema; model_construct skips
+            # per-field re-validation
+            data=[CryptoResponse.model_construct(**row._mapping) for row in data],
             total=total,
             page=page,
             page_size=page_size,
+            next_cursor=next_cursor,
             request_id=request_id,
             api_latency_ms=round(api_latency_ms, 2)
         )
         
+    except HTTPException:
+        # decode_cursor raises 422 for malformed cursors; let it through
+        # instead of burying it in the generic 500 below
+        raise
     except Exception as e:
         logger.error(f"Error fetching data: {str(e)}", extra={"request_id": request_id})
         raise HTTPException(status_code=500, detail=str(e))
@@ -179,65 +318,130 @@ async def get_stats(db: Session = Depends(get_db)):
     - Success rate
     - Run duration
     """
-    sources = ["coinpaprika", "coingecko", "csv"]
-    stats = []
-    
-    for source in sources:
-        # Get checkpoint
-        checkpoint = db.query(ETLCheckpoint).filter(
-            ETLCheckpoint.source_name == source
-        ).first()
-        
-        # Get run statistics
-        runs = db.query(ETLRun).filter(ETLRun.source_name == source).all()
-        total_runs = len(runs)
-        successful_runs = len([r for r in runs if r.status == "success"])
-        success_rate = (successful_runs / total_runs * 100) if total_runs > 0 else 0
-        
-        # Get last success and failure
-        last_success = db.query(ETLRun).filter(
-            ETLRun.source_name == source,
+    async with status_cache_lock:
+        cached = status_cache.get("stats")
+        if cached is not None:
+            status_cache_requests.labels(endpoint="/stats", result="hit").inc()
+            return cached
+        status_cache_requests.labels(endpoint="/stats", result="miss").inc()
+
+        sources = ["coinpaprika", "coingecko", "csv"]
+        stats = []
+
+        # One query per table instead of 4 per source (N+1)
+        checkpoints = {
+            c.source_name: c
+            for c in db.query(ETLCheckpoint).filter(
+                ETLCheckpoint.source_name.in_(sources)
+            ).all()
+        }
+
+        # Run counts and last completion per (source, status) in one aggregate
+        run_agg = db.query(
+            ETLRun.source_name,
+            ETLRun.status,
+            func.count(ETLRun.id),
+            func.max(ETLRun.completed_at)
+        ).filter(
+            ETLRun.source_name.in_(sources)
+        ).group_by(ETLRun.source_name, ETLRun.status).all()
+
+        totals = {}
+        successes = {}
+        last_success_at = {}
+        last_failure_at = {}
+        for source_name, status, run_count, last_completed in run_agg:
+            totals[source_name] = totals.get(source_name, 0) + run_count
+            if status == "success":
+                successes[source_name] = run_count
+                last_success_at[source_name] = last_completed
+            elif status == "failed":
+                last_failure_at[source_name] = last_completed
+
+        # Duration of the most recent successful run per source
+        latest_success = db.query(
+            ETLRun.source_name,
+            func.max(ETLRun.completed_at).label("completed_at")
+        ).filter(
+            ETLRun.source_name.in_(sources),
             ETLRun.status == "success"
-        ).order_by(ETLRun.completed_at.desc()).first()
-        
-        last_failure = db.query(ETLRun).filter(
-            ETLRun.source_name == source,
-            ETLRun.status == "failed"
-        ).order_by(ETLRun.completed_at.desc()).first()
-        
-        stats.append(StatsResponse(
-            source=source,
-            records_processed=checkpoint.records_processed if checkpoint else 0,
-            last_success=last_success.completed_at if last_success else None,
-            last_failure=last_failure.completed_at if last_failure else None,
-            last_run_duration_seconds=last_success.duration_seconds if last_success else None,
-            total_runs=total_runs,
-            success_rate=round(success_rate, 2)
-        ))
-    
-    return stats
+        ).group_by(ETLRun.source_name).subquery()
+
+        last_durations = {
+            r.source_name: r.duration_seconds
+            for r in db.query(ETLRun).join(
+                latest_success,
+                and_(
+                    ETLRun.source_name == latest_success.c.source_name,
+                    ETLRun.completed_at == latest_success.c.completed_at
+                )
+            ).all()
+        }
+
+        for source in sources:
+            checkpoint = checkpoints.get(source)
+            total_runs = totals.get(source, 0)
+            successful_runs = successes.get(source, 0)
+            success_rate = (successful_runs / total_runs * 100) if total_runs > 0 else 0
+
+            stats.append(StatsResponse(
+                source=source,
+                records_processed=checkpoint.records_processed if checkpoint else 0,
+                last_success=last_success_at.get(source),
+                last_failure=last_failure_at.get(source),
+                last_run_duration_seconds=last_durations.get(source),
+                total_runs=total_runs,
+                success_rate=round(success_rate, 2)
+            ))
+
+        status_cache["stats"] = stats
+        return stats
 
 
 @app.get("/runs", response_model=list[ETLRunResponse], tags=["Stats"])
 async def get_runs(
     limit: int = Query(10, ge=1, le=100, description="Number of runs to return"),
     source: Optional[str] = Query(None, description="Filter by source"),
+    verbose: bool = Query(False, description="Include error messages"),
     db: Session = Depends(get_db)
 ):
     """
     Get recent ETL runs
-    
+
     - **limit**: Number of runs to return (max 100)
     - **source**: Filter by data source
+    - **verbose**: Include the (potentially large) error_message text
     """
-    query = db.query(ETLRun)
-    
+    # Project only the response columns; the run_metadata JSON blob is
+    # never returned and error_message only travels when asked for
+    columns = [
+        ETLRun.run_id,
+        ETLRun.source_name,
+        ETLRun.status,
+        ETLRun.records_processed,
+        ETLRun.records_failed,
+        ETLRun.duration_seconds,
+        ETLRun.started_at,
+        ETLRun.completed_at,
+    ]
+    if verbose:
+        columns.append(ETLRun.error_message)
+
+    query = db.query(*columns)
+
     if source:
         query = query.filter(ETLRun.source_name == source)
-    
-    runs = query.order_by(ETLRun.started_at.desc()).limit(limit).all()
-    
-    return [ETLRunResponse.model_validate(run) for run in runs]
+
+    # Stream rows in batches rather than materializing the full result set
+    runs = query.order_by(ETLRun.started_at.desc()).limit(limit).yield_per(100)
+
+    results = []
+    for row in runs:
+        fields = dict(row._mapping)
+        if not verbose:
+            fields["error_message"] = None
+        results.append(ETLRunResponse.model_construct(**fields))
+    return results
 
 
 @app.get("/metrics", tags=["Metrics"])
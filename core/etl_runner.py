@@ -1,55 +1,59 @@
-import time
-import schedule
+import asyncio
+from datetime import datetime, timezone
+from apscheduler.schedulers.blocking import BlockingScheduler
 from core.database import SessionLocal
 from ingestion import CoinPaprikaIngestion, CoinGeckoIngestion, CSVIngestion
 from core.logging_config import logger
 
+INGESTION_CLASSES = [CoinPaprikaIngestion, CoinGeckoIngestion, CSVIngestion]
 
-def run_etl():
-    """Run ETL for all sources"""
-    logger.info("Starting ETL run for all sources")
-    
+
+def run_source(ingestion_cls):
+    """Run a single ingestion source with its own session"""
     db = SessionLocal()
-    
     try:
-        # Run CoinPaprika ingestion
-        logger.info("Running CoinPaprika ingestion")
-        coinpaprika = CoinPaprikaIngestion(db)
-        coinpaprika.run()
-        
-        # Run CoinGecko ingestion
-        logger.info("Running CoinGecko ingestion")
-        coingecko = CoinGeckoIngestion(db)
-        coingecko.run()
-        
-        # Run CSV ingestion
-        logger.info("Running CSV ingestion")
-        csv = CSVIngestion(db)
-        csv.run()
-        
-        logger.info("ETL run completed for all sources")
-        
-    except Exception as e:
-        logger.error(f"ETL run failed: {str(e)}", exc_info=True)
+        ingestion_cls(db).run()
     finally:
         db.close()
 
 
+async def run_etl_async():
+    """Run ETL for all sources concurrently"""
+    logger.info("Starting ETL run for all sources")
+
+    # The three sources are independent and network-bound, so dispatch
+    # them in parallel; each gets a dedicated session (sessions are not
+    # safe to share across threads).
+    results = await asyncio.gather(
+        *[asyncio.to_thread(run_source, cls) for cls in INGESTION_CLASSES],
+        return_exceptions=True
+    )
+
+    for cls, result in zip(INGESTION_CLASSES, results):
+        if isinstance(result, Exception):
+            logger.error(f"ETL run failed for {cls.__name__}: {str(result)}")
+
+    logger.info("ETL run completed for all sources")
+
+
+def run_etl():
+    """Run ETL for all sources"""
+    asyncio.run(run_etl_async())
+
+
 def run_scheduler():
     """Run ETL scheduler"""
     logger.info("ETL Scheduler started")
-    
-    # Run immediately on startup
-    logger.info("Running initial ETL on startup")
-    run_etl()
-    
-    # Schedule ETL to run every 6 hours
-    schedule.every(6).hours.do(run_etl)
-    
-    # Keep scheduler running
-    while True:
-        schedule.run_pending()
-        time.sleep(60)  # Check every minute
+
+    # Event-driven interval trigger instead of a poll-and-sleep loop;
+    # next_run_time fires the first cycle immediately on startup. Must
+    # be timezone-aware: APScheduler reads a naive datetime in the
+    # scheduler's local timezone, which shifts (or skips) the startup
+    # run on any host not running UTC
+    scheduler = BlockingScheduler()
+    scheduler.add_job(run_etl, 'interval', hours=6,
+                      next_run_time=datetime.now(timezone.utc))
+    scheduler.start()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,13 @@
+"""One-shot database initialization: `python -m core.init_db`"""
+from core.database import init_db
+from core.logging_config import logger
+
+
+def main():
+    logger.info("Creating database tables")
+    init_db()
+    logger.info("Database tables created")
+
+
+if __name__ == "__main__":
+    main()
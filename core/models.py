@@ -1,7 +1,24 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, JSON, Index
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, JSON, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.sqlite import DATETIME as SQLiteDateTime
+from sqlalchemy.orm import validates
 from sqlalchemy.sql import func
 from core.database import Base
 
+# JSONB on Postgres (binary, TOAST-compressed, indexable); plain JSON
+# elsewhere so the models still work against SQLite. none_as_null keeps
+# skipped payloads as SQL NULL rather than a JSON null document
+JSONPayload = JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql")
+
+# SQLite stores CURRENT_TIMESTAMP at second precision but renders bound
+# datetimes with microseconds appended, so mixed-format strings compare
+# lexically rather than chronologically and keyset seeks over the
+# column match every row. Truncating bound values to the stored format
+# keeps the comparison consistent; Postgres is unaffected
+CursorTimestamp = DateTime(timezone=True).with_variant(
+    SQLiteDateTime(truncate_microseconds=True), "sqlite"
+)
+
 
 class RawCoinPaprika(Base):
     """Raw data from CoinPaprika API"""
@@ -16,7 +33,7 @@ class RawCoinPaprika(Base):
     volume_24h_usd = Column(Float)
     market_cap_usd = Column(Float)
     percent_change_24h = Column(Float)
-    raw_data = Column(JSON)
+    raw_data = Column(JSONPayload)
     ingested_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     
     __table_args__ = (
@@ -37,7 +54,7 @@ class RawCoinGecko(Base):
     total_volume = Column(Float)
     price_change_24h = Column(Float)
     price_change_percentage_24h = Column(Float)
-    raw_data = Column(JSON)
+    raw_data = Column(JSONPayload)
     ingested_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     
     __table_args__ = (
@@ -56,7 +73,7 @@ class RawCSV(Base):
     price = Column(Float)
     market_cap = Column(Float)
     volume = Column(Float)
-    raw_data = Column(JSON)
+    raw_data = Column(JSONPayload)
     ingested_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     
     __table_args__ = (
@@ -69,9 +86,11 @@ class UnifiedCrypto(Base):
     __tablename__ = "unified_crypto"
     
     id = Column(Integer, primary_key=True, index=True)
-    coin_id = Column(String(100), nullable=False, index=True)
+    # coin_id lookups are covered by the (coin_id, source) unique
+    # constraint; no separate single-column index
+    coin_id = Column(String(100), nullable=False)
     name = Column(String(255), nullable=False)
-    symbol = Column(String(50), nullable=False, index=True)
+    symbol = Column(String(50), nullable=False)
     price_usd = Column(Float)
     market_cap_usd = Column(Float)
     volume_24h_usd = Column(Float)
@@ -80,11 +99,29 @@ class UnifiedCrypto(Base):
     source = Column(String(50), nullable=False, index=True)
     source_updated_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
-    
+    # CursorTimestamp: /data keyset pagination seeks on this column
+    updated_at = Column(CursorTimestamp, server_default=func.now(), onupdate=func.now())
+
+    @validates('symbol')
+    def normalize_symbol(self, key, value):
+        """ORM-only backstop: the production write paths all go through
+        Core inserts and uppercase the symbol themselves before binding,
+        so this only guards ad-hoc ORM writes (tests, shell sessions)"""
+        return value.upper() if value else value
+
     __table_args__ = (
-        Index('idx_unified_coin_source', 'coin_id', 'source'),
+        UniqueConstraint('coin_id', 'source', name='uq_unified_coin_source'),
         Index('idx_unified_symbol', 'symbol'),
+        # Covering index for the /data listing: ordered seek on
+        # (updated_at, id) with the response columns INCLUDEd so the
+        # query can be answered index-only
+        Index(
+            'idx_unified_listing', updated_at.desc(), id.desc(),
+            postgresql_include=[
+                'coin_id', 'symbol', 'source', 'price_usd', 'market_cap_usd',
+                'volume_24h_usd', 'price_change_24h_percent', 'name', 'rank'
+            ]
+        ),
     )
 
 
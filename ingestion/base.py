@@ -1,7 +1,19 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Any
+from typing import Iterable, List, Optional, Any
 from datetime import datetime
+import csv
+import io
+import threading
 import uuid
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from sqlalchemy import (
+    bindparam, func, insert, lambda_stmt, literal_column, select, update
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 from core.models import ETLCheckpoint, ETLRun, SchemaDrift
 from core.logging_config import logger
@@ -9,9 +21,55 @@ from tenacity import retry, stop_after_attempt, wait_exponential
 import time
 
 
+# lambda_stmt caches the compiled SQL for this small bookkeeping
+# lookup, so repeated calls only rebind parameters
+CHECKPOINT_STMT = lambda_stmt(
+    lambda: select(ETLCheckpoint).where(
+        ETLCheckpoint.source_name == bindparam("source")
+    )
+)
+# Built once; the engine's compiled cache reuses the rendered SQL, so
+# per-run inserts skip both construct building and ORM unit-of-work
+RUN_INSERT = insert(ETLRun)
+
+# Buffered drift events flush once this many are pending
+DRIFT_FLUSH_THRESHOLD = 1000
+
+
 class BaseIngestion(ABC):
     """Base class for all data ingestion sources"""
-    
+
+    _http_session: Optional[requests.Session] = None
+
+    # Process-local checkpoint cache keyed by source_name. All
+    # checkpoint writers share this process (the scheduler runs every
+    # source here), so write-through invalidation in update_checkpoint
+    # keeps it fresh without a LISTEN/NOTIFY channel
+    _ckpt_cache: dict = {}
+    _ckpt_cache_hits = 0
+    _ckpt_lock = threading.Lock()
+
+    @classmethod
+    def get_session(cls) -> requests.Session:
+        """Shared pooled HTTP session with keep-alive and retries"""
+        if BaseIngestion._http_session is None:
+            session = requests.Session()
+            retries = Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(["GET"])
+            )
+            adapter = HTTPAdapter(
+                max_retries=retries,
+                pool_connections=10,
+                pool_maxsize=10
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            BaseIngestion._http_session = session
+        return BaseIngestion._http_session
+
     def __init__(self, source_name: str, db: Session):
         self.source_name = source_name
         self.db = db
@@ -19,36 +77,143 @@ class BaseIngestion(ABC):
         self.records_processed = 0
         self.records_failed = 0
         self.start_time = None
+        self._drift_seen = set()
+        # Column-oriented drift buffer: parallel lists are cheaper than
+        # a dict per event when a noisy feed drifts on many fields
+        self._drift_buf = {
+            "source_name": [],
+            "drift_type": [],
+            "field_name": [],
+            "expected_type": [],
+            "actual_type": [],
+            "sample_value": [],
+            "confidence_score": []
+        }
         
+    def copy_rows(self, table: str, columns: List[str], rows: Iterable[dict]):
+        """COPY rows into an append-only table via the driver cursor
+
+        COPY FROM STDIN bypasses SQL parsing entirely, which leaves even
+        batched INSERTs well behind on large loads. Postgres-only, like
+        the ON CONFLICT upserts; dict/list values are serialized as JSON
+        for JSONB columns, None lands as NULL. rows may be a generator -
+        they stream straight into the buffer without an intermediate
+        list of dicts.
+        """
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for row in rows:
+            writer.writerow([
+                orjson.dumps(value).decode() if isinstance(value, (dict, list)) else value
+                for value in (row.get(column) for column in columns)
+            ])
+        buf.seek(0)
+
+        cursor = self.db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT CSV)",
+                buf
+            )
+        finally:
+            cursor.close()
+
+    def bulk_upsert(self, model, rows: List[dict], conflict_cols: List[str],
+                    update_cols: List[str], returning_updated: bool = False):
+        """Upsert a batch in one INSERT ... ON CONFLICT DO UPDATE
+
+        One round trip and one plan for the whole batch, and the atomic
+        upsert avoids the SELECT-then-UPDATE race. SQLite 3.24+ shares
+        the ON CONFLICT syntax, so test databases take the same path.
+
+        With returning_updated the written rows come back via RETURNING,
+        each with an `updated` flag, so callers can verify the write
+        without a follow-up SELECT. On Postgres the flag is `(xmax <> 0)`
+        - the conflict handler already stamps xmax, so insert-vs-update
+        discrimination is free. SQLite has no MVCC marker to read, so
+        the fallback returns a constant-true sentinel there.
+        """
+        if not rows:
+            return [] if returning_updated else None
+        sqlite = self.db.get_bind().dialect.name == "sqlite"
+        insert_fn = sqlite_insert if sqlite else pg_insert
+        stmt = insert_fn(model).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=conflict_cols,
+            set_={col: stmt.excluded[col] for col in update_cols}
+        )
+        if returning_updated:
+            updated = literal_column("1" if sqlite else "(xmax <> 0)")
+            stmt = stmt.returning(
+                *(getattr(model, col) for col in conflict_cols + update_cols),
+                updated.label("updated")
+            )
+            return self.db.execute(stmt).all()
+        self.db.execute(stmt)
+
     def get_checkpoint(self) -> Optional[ETLCheckpoint]:
-        """Get last checkpoint for this source"""
-        return self.db.query(ETLCheckpoint).filter(
-            ETLCheckpoint.source_name == self.source_name
-        ).first()
+        """Get last checkpoint for this source, cached per process"""
+        with BaseIngestion._ckpt_lock:
+            cached = BaseIngestion._ckpt_cache.get(self.source_name)
+            if cached is not None:
+                BaseIngestion._ckpt_cache_hits += 1
+                return cached
+
+        checkpoint = self.db.execute(
+            CHECKPOINT_STMT, {"source": self.source_name}
+        ).scalars().first()
+        if checkpoint is not None:
+            # Detach so the cached row outlives this session
+            self.db.expunge(checkpoint)
+            with BaseIngestion._ckpt_lock:
+                BaseIngestion._ckpt_cache[self.source_name] = checkpoint
+        return checkpoint
     
-    def update_checkpoint(self, last_id: str, timestamp: datetime, status: str, error: str = None):
-        """Update checkpoint for this source"""
-        checkpoint = self.get_checkpoint()
-        if not checkpoint:
-            checkpoint = ETLCheckpoint(source_name=self.source_name)
-            self.db.add(checkpoint)
-        
-        checkpoint.last_processed_id = last_id
-        checkpoint.last_processed_timestamp = timestamp
-        checkpoint.records_processed = self.records_processed
-        checkpoint.last_run_status = status
-        checkpoint.last_error = error
-        self.db.commit()
+    def update_checkpoint(self, last_id: str, timestamp: Optional[datetime] = None,
+                          status: str = "success", error: str = None,
+                          commit: bool = True):
+        """Upsert checkpoint for this source in one round trip
+
+        ON CONFLICT on source_name replaces the SELECT-then-mutate flow;
+        run() passes commit=False so the checkpoint and the run record
+        land under a single COMMIT (one fsync instead of two). With no
+        explicit timestamp the database stamps now() itself, so callers
+        skip the Python-side datetime allocation entirely.
+        """
+        self.bulk_upsert(
+            ETLCheckpoint,
+            [{
+                "source_name": self.source_name,
+                "last_processed_id": last_id,
+                "last_processed_timestamp": timestamp if timestamp is not None
+                                            else func.now(),
+                "records_processed": self.records_processed,
+                "last_run_status": status,
+                "last_error": error
+            }],
+            conflict_cols=["source_name"],
+            update_cols=[
+                "last_processed_id", "last_processed_timestamp",
+                "records_processed", "last_run_status", "last_error"
+            ]
+        )
+        # Write-through invalidation: the next get_checkpoint re-reads
+        with BaseIngestion._ckpt_lock:
+            BaseIngestion._ckpt_cache.pop(self.source_name, None)
+        if commit:
+            self.db.commit()
     
     def create_run(self):
         """Create ETL run record"""
-        run = ETLRun(
-            run_id=self.run_id,
-            source_name=self.source_name,
-            status="started",
-            run_metadata={"started_by": "etl_scheduler"}
+        self.db.execute(
+            RUN_INSERT,
+            {
+                "run_id": self.run_id,
+                "source_name": self.source_name,
+                "status": "started",
+                "run_metadata": {"started_by": "etl_scheduler"}
+            }
         )
-        self.db.add(run)
         self.db.commit()
         logger.info(f"ETL run started", extra={
             "run_id": self.run_id,
@@ -56,20 +221,35 @@ class BaseIngestion(ABC):
         })
     
     def complete_run(self, status: str, error: str = None):
-        """Mark ETL run as complete"""
-        run = self.db.query(ETLRun).filter(ETLRun.run_id == self.run_id).first()
-        if run:
-            run.status = status
-            run.records_processed = self.records_processed
-            run.records_failed = self.records_failed
-            run.completed_at = datetime.utcnow()
-            run.error_message = error
-            
-            if self.start_time:
-                run.duration_seconds = time.time() - self.start_time
-            
-            self.db.commit()
-            
+        """Mark ETL run as complete
+
+        One UPDATE ... RETURNING instead of SELECT-then-mutate: the
+        round trip that loaded the run row is gone, and the final state
+        comes back to the caller on the same cursor.
+        """
+        values = {
+            "status": status,
+            "records_processed": self.records_processed,
+            "records_failed": self.records_failed,
+            "completed_at": func.now(),
+            "error_message": error
+        }
+        if self.start_time:
+            values["duration_seconds"] = time.time() - self.start_time
+
+        row = self.db.execute(
+            update(ETLRun)
+            .where(ETLRun.run_id == self.run_id)
+            .values(**values)
+            .returning(
+                ETLRun.status, ETLRun.records_processed,
+                ETLRun.records_failed, ETLRun.completed_at,
+                ETLRun.error_message
+            )
+        ).first()
+        self.db.commit()
+
+        if row is not None:
             logger.info(f"ETL run completed", extra={
                 "run_id": self.run_id,
                 "source": self.source_name,
@@ -77,45 +257,72 @@ class BaseIngestion(ABC):
                 "records_processed": self.records_processed,
                 "records_failed": self.records_failed
             })
+        return row
     
     def detect_schema_drift(self, expected_fields: dict, actual_data: dict):
-        """Detect schema changes in source data"""
-        # Check for missing fields
-        for field, expected_type in expected_fields.items():
-            if field not in actual_data:
-                drift = SchemaDrift(
-                    source_name=self.source_name,
-                    drift_type="missing_field",
-                    field_name=field,
-                    expected_type=expected_type,
-                    confidence_score=1.0
-                )
-                self.db.add(drift)
-                logger.warning(f"Schema drift detected: missing field", extra={
-                    "source": self.source_name,
-                    "field": field,
-                    "expected_type": expected_type
-                })
-        
-        # Check for new fields
-        for field, value in actual_data.items():
-            if field not in expected_fields:
-                drift = SchemaDrift(
-                    source_name=self.source_name,
-                    drift_type="new_field",
-                    field_name=field,
-                    actual_type=type(value).__name__,
-                    sample_value=str(value)[:200],
-                    confidence_score=0.8
-                )
-                self.db.add(drift)
-                logger.warning(f"Schema drift detected: new field", extra={
-                    "source": self.source_name,
-                    "field": field,
-                    "actual_type": type(value).__name__
-                })
-        
+        """Detect schema changes in source data
+
+        Events land in the columnar buffer and persist in batches - at
+        the flush threshold and at end of run - instead of paying a
+        commit per detection call.
+        """
+        expected_keys = set(expected_fields)
+        actual_keys = set(actual_data)
+
+        # Set algebra instead of per-field dict scans; drift signatures
+        # already reported during this run are skipped
+        buf = self._drift_buf
+        missing = new = 0
+        for field in expected_keys - actual_keys:
+            signature = ("missing_field", field)
+            if signature in self._drift_seen:
+                continue
+            self._drift_seen.add(signature)
+            buf["source_name"].append(self.source_name)
+            buf["drift_type"].append("missing_field")
+            buf["field_name"].append(field)
+            buf["expected_type"].append(expected_fields[field])
+            buf["actual_type"].append(None)
+            buf["sample_value"].append(None)
+            buf["confidence_score"].append(1.0)
+            missing += 1
+
+        for field in actual_keys - expected_keys:
+            signature = ("new_field", field)
+            if signature in self._drift_seen:
+                continue
+            self._drift_seen.add(signature)
+            value = actual_data[field]
+            buf["source_name"].append(self.source_name)
+            buf["drift_type"].append("new_field")
+            buf["field_name"].append(field)
+            buf["expected_type"].append(None)
+            buf["actual_type"].append(type(value).__name__)
+            buf["sample_value"].append(str(value)[:200])
+            buf["confidence_score"].append(0.8)
+            new += 1
+
+        if missing or new:
+            logger.warning(f"Schema drift detected", extra={
+                "source": self.source_name,
+                "missing_fields": missing,
+                "new_fields": new
+            })
+            if len(buf["field_name"]) >= DRIFT_FLUSH_THRESHOLD:
+                self.flush_drift()
+
+    def flush_drift(self):
+        """Persist buffered drift events in one batched insert"""
+        buf = self._drift_buf
+        if not buf["field_name"]:
+            return
+
+        columns = list(buf)
+        rows = [dict(zip(columns, values)) for values in zip(*buf.values())]
+        self.db.execute(insert(SchemaDrift), rows)
         self.db.commit()
+        for column in buf.values():
+            column.clear()
     
     @retry(
         stop=stop_after_attempt(3),
@@ -148,18 +355,23 @@ class BaseIngestion(ABC):
             
             if not data:
                 logger.warning(f"No data fetched", extra={"source": self.source_name})
+                self.update_checkpoint("", status="success", commit=False)
                 self.complete_run("success")
-                self.update_checkpoint("", datetime.utcnow(), "success")
                 return
-            
+
             # Transform and load
             self.transform_and_load(data)
-            
-            # Update checkpoint and complete
+
+            # Persist any drift events buffered during the run
+            self.flush_drift()
+
+            # Update checkpoint and complete under one commit.
+            # records_processed is used as the marker since data may be
+            # a streaming iterator
             self.update_checkpoint(
-                str(len(data)),
-                datetime.utcnow(),
-                "success"
+                str(self.records_processed),
+                status="success",
+                commit=False
             )
             self.complete_run("success")
             
@@ -174,7 +386,19 @@ class BaseIngestion(ABC):
                 "source": self.source_name,
                 "error": error_msg
             }, exc_info=True)
-            
-            self.update_checkpoint("", datetime.utcnow(), "failure", error_msg)
+
+            # Best-effort: drift detected before the failure is often
+            # the failure's cause, so persist it; never let a secondary
+            # DB error mask the original exception
+            try:
+                self.flush_drift()
+            except Exception:
+                self.db.rollback()
+                logger.warning(f"Failed to flush drift events", extra={
+                    "source": self.source_name
+                }, exc_info=True)
+
+            self.update_checkpoint("", status="failure", error=error_msg,
+                                   commit=False)
             self.complete_run("failed", error_msg)
             raise
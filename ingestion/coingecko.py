@@ -1,13 +1,14 @@
-import requests
 from typing import List
-from datetime import datetime
+from datetime import datetime, timezone
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
 from ingestion.base import BaseIngestion
 from core.models import RawCoinGecko, UnifiedCrypto
-from schemas.crypto import CoinGeckoSchema
+from schemas.crypto import CoinGeckoSchema, CoinGeckoListAdapter
 from core.config import get_settings
 from core.logging_config import logger
-import time
+import orjson
 
 settings = get_settings()
 
@@ -20,15 +21,15 @@ class CoinGeckoIngestion(BaseIngestion):
         self.api_key = settings.coingecko_api_key
         self.base_url = "https://api.coingecko.com/api/v3"
         self.rate_limit_delay = 1.5  # CoinGecko free tier: ~10-50 calls/min
+        self.session = self.get_session()
+        # Built once; the session itself is shared across sources, so
+        # auth headers stay per-instance rather than session-wide
+        self.headers = {"x-cg-demo-api-key": self.api_key} if self.api_key else {}
         
     def fetch_data(self) -> List[dict]:
         """Fetch cryptocurrency data from CoinGecko API"""
         logger.info("Fetching data from CoinGecko API")
-        
-        headers = {}
-        if self.api_key:
-            headers["x-cg-demo-api-key"] = self.api_key
-        
+
         params = {
             "vs_currency": "usd",
             "order": "market_cap_desc",
@@ -38,85 +39,95 @@ class CoinGeckoIngestion(BaseIngestion):
             "price_change_percentage": "24h"
         }
         
-        response = requests.get(
+        response = self.session.get(
             f"{self.base_url}/coins/markets",
-            headers=headers,
+            headers=self.headers,
             params=params,
             timeout=30
         )
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
         
         logger.info(f"Fetched {len(data)} coins from CoinGecko")
         return data
     
+    def validate_batch(self, data: List[dict]) -> List[tuple]:
+        """Validate a batch in one adapter call, per-row on failure"""
+        try:
+            validated = CoinGeckoListAdapter.validate_python(data)
+            return list(zip(data, validated))
+        except ValidationError:
+            # At least one bad record - fall back to per-row validation
+            # so good rows survive and failures are counted
+            pairs = []
+            for item in data:
+                try:
+                    pairs.append((item, CoinGeckoSchema(**item)))
+                except Exception as e:
+                    logger.error(f"Failed to validate CoinGecko record: {str(e)}", extra={
+                        "coin_id": item.get("id"),
+                        "error": str(e)
+                    })
+                    self.records_failed += 1
+            return pairs
+
     def transform_and_load(self, data: List[dict]):
         """Transform and load CoinGecko data"""
-        checkpoint = self.get_checkpoint()
-        last_timestamp = checkpoint.last_processed_timestamp if checkpoint else None
-        
-        for item in data:
-            try:
-                # Validate with Pydantic
-                validated = CoinGeckoSchema(**item)
-                
-                # Store raw data
-                raw_record = RawCoinGecko(
-                    coin_id=validated.coin_id,
-                    name=validated.name,
-                    symbol=validated.symbol,
-                    current_price=validated.current_price,
-                    market_cap=validated.market_cap,
-                    total_volume=validated.total_volume,
-                    price_change_24h=validated.price_change_24h,
-                    price_change_percentage_24h=validated.price_change_percentage_24h,
-                    raw_data=item
-                )
-                self.db.add(raw_record)
-                
-                # Transform to unified schema
-                unified = UnifiedCrypto(
-                    coin_id=validated.coin_id,
-                    name=validated.name,
-                    symbol=validated.symbol.upper(),
-                    price_usd=validated.current_price,
-                    market_cap_usd=validated.market_cap,
-                    volume_24h_usd=validated.total_volume,
-                    price_change_24h_percent=validated.price_change_percentage_24h,
-                    rank=None,
-                    source="coingecko",
-                    source_updated_at=datetime.utcnow()
+        now = datetime.now(timezone.utc)
+        store_raw = settings.store_raw_payload
+        raw_rows = []
+        unified_rows = []
+
+        for item, validated in self.validate_batch(data):
+            raw_rows.append({
+                "coin_id": validated.coin_id,
+                "name": validated.name,
+                "symbol": validated.symbol,
+                "current_price": validated.current_price,
+                "market_cap": validated.market_cap,
+                "total_volume": validated.total_volume,
+                "price_change_24h": validated.price_change_24h,
+                "price_change_percentage_24h": validated.price_change_percentage_24h,
+                "raw_data": item if store_raw else None
+            })
+
+            unified_rows.append({
+                "coin_id": validated.coin_id,
+                "name": validated.name,
+                "symbol": validated.symbol.upper(),
+                "price_usd": validated.current_price,
+                "market_cap_usd": validated.market_cap,
+                "volume_24h_usd": validated.total_volume,
+                "price_change_24h_percent": validated.price_change_percentage_24h,
+                "rank": None,
+                "source": "coingecko",
+                "source_updated_at": now,
+                "updated_at": now
+            })
+
+            self.records_processed += 1
+
+        try:
+            if unified_rows:
+                # Bulk insert raw rows (insertmanyvalues folds the batch into
+                # one multi-row INSERT), then upsert the unified table in one
+                # INSERT ... ON CONFLICT instead of per-row SELECT+UPDATE
+                self.db.execute(insert(RawCoinGecko), raw_rows)
+
+                self.bulk_upsert(
+                    UnifiedCrypto, unified_rows,
+                    conflict_cols=["coin_id", "source"],
+                    update_cols=[
+                        "name", "symbol", "price_usd", "market_cap_usd",
+                        "volume_24h_usd", "price_change_24h_percent",
+                        "source_updated_at", "updated_at"
+                    ]
                 )
-                
-                # Check if record exists (upsert logic)
-                existing = self.db.query(UnifiedCrypto).filter(
-                    UnifiedCrypto.coin_id == validated.coin_id,
-                    UnifiedCrypto.source == "coingecko"
-                ).first()
-                
-                if existing:
-                    existing.price_usd = unified.price_usd
-                    existing.market_cap_usd = unified.market_cap_usd
-                    existing.volume_24h_usd = unified.volume_24h_usd
-                    existing.price_change_24h_percent = unified.price_change_24h_percent
-                    existing.source_updated_at = unified.source_updated_at
-                    existing.updated_at = datetime.utcnow()
-                else:
-                    self.db.add(unified)
-                
-                self.records_processed += 1
-                
-                # Commit in batches
-                if self.records_processed % 10 == 0:
-                    self.db.commit()
-                    
-            except Exception as e:
-                logger.error(f"Failed to process CoinGecko record: {str(e)}", extra={
-                    "coin_id": item.get("id"),
-                    "error": str(e)
-                })
-                self.records_failed += 1
-                continue
-        
-        self.db.commit()
+
+            self.db.commit()
+        except Exception:
+            # Leave the session clean for the failure-path bookkeeping
+            self.db.rollback()
+            raise
+
         logger.info(f"CoinGecko ingestion completed: {self.records_processed} processed, {self.records_failed} failed")
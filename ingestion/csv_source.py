@@ -1,35 +1,71 @@
 import pandas as pd
-from typing import List
-from datetime import datetime
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+from typing import Iterable, Iterator, List
+from datetime import datetime, timezone
 from sqlalchemy.orm import Session
 from ingestion.base import BaseIngestion
 from core.models import RawCSV, UnifiedCrypto
 from schemas.crypto import CSVSchema
+from core.config import get_settings
 from core.logging_config import logger
 import os
 
+settings = get_settings()
+
+
+# Explicit Arrow types skip inference and keep parsing vectorized
+CSV_COLUMN_TYPES = {
+    'coin_id': pa.string(),
+    'name': pa.string(),
+    'symbol': pa.string(),
+    'price': pa.float64(),
+    'market_cap': pa.float64(),
+    'volume': pa.float64()
+}
+
+RAW_CSV_COLUMNS = ['coin_id', 'name', 'symbol', 'price', 'market_cap', 'volume', 'raw_data']
+
+
+def uppercase_symbol(batch: pa.RecordBatch) -> pa.RecordBatch:
+    """Uppercase the symbol column with Arrow's vectorized string kernel"""
+    idx = batch.schema.get_field_index('symbol')
+    arrays = [
+        pc.utf8_upper(column) if i == idx else column
+        for i, column in enumerate(batch.columns)
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=batch.schema)
+
 
 class CSVIngestion(BaseIngestion):
     """Ingest data from CSV file"""
-    
-    def __init__(self, db: Session, csv_path: str = "/app/data/crypto_data.csv"):
+
+    def __init__(self, db: Session, csv_path: str = "/app/data/crypto_data.csv",
+                 block_size: int = 1 << 20, strict_validation: bool = False):
         super().__init__("csv", db)
         self.csv_path = csv_path
-        
-    def fetch_data(self) -> List[dict]:
-        """Read data from CSV file"""
+        self.block_size = block_size
+        self.strict_validation = strict_validation
+
+    def fetch_data(self) -> Iterator[pd.DataFrame]:
+        """Read data from CSV file in bounded-memory chunks"""
         logger.info(f"Reading data from CSV: {self.csv_path}")
-        
+
         if not os.path.exists(self.csv_path):
             logger.warning(f"CSV file not found: {self.csv_path}")
             # Create sample CSV if it doesn't exist
             self.create_sample_csv()
-        
+
         try:
-            df = pd.read_csv(self.csv_path)
-            data = df.to_dict('records')
-            logger.info(f"Read {len(data)} records from CSV")
-            return data
+            # Arrow's streaming reader parses vectorized and keeps peak
+            # memory bounded by block_size regardless of file size
+            reader = pacsv.open_csv(
+                self.csv_path,
+                read_options=pacsv.ReadOptions(block_size=self.block_size),
+                convert_options=pacsv.ConvertOptions(column_types=CSV_COLUMN_TYPES)
+            )
+            return (uppercase_symbol(batch).to_pandas() for batch in reader)
         except Exception as e:
             logger.error(f"Failed to read CSV: {str(e)}")
             raise
@@ -50,59 +86,103 @@ class CSVIngestion(BaseIngestion):
         df.to_csv(self.csv_path, index=False)
         logger.info(f"Created sample CSV at {self.csv_path}")
     
-    def transform_and_load(self, data: List[dict]):
-        """Transform and load CSV data"""
-        checkpoint = self.get_checkpoint()
-        last_timestamp = checkpoint.last_processed_timestamp if checkpoint else None
-        
+    def transform_and_load(self, df_iter: Iterator[pd.DataFrame]):
+        """Transform and load CSV data chunk by chunk"""
+        for chunk in df_iter:
+            self.load_chunk(chunk)
+
+        logger.info(f"CSV ingestion completed: {self.records_processed} processed, {self.records_failed} failed")
+
+    def load_chunk(self, chunk: pd.DataFrame):
+        """Validate and bulk-upsert one DataFrame chunk
+
+        Coercion runs vectorized on the DataFrame instead of through one
+        CSVSchema instantiation per row; use strict_validation to route
+        malformed files through the per-row Pydantic slow path.
+        """
+        if self.strict_validation:
+            self.load_chunk_validated(chunk)
+            return
+
+        now = datetime.now(timezone.utc)
+        total = len(chunk)
+
+        df = chunk.copy()
+        df['coin_id'] = df['coin_id'].astype('string')
+        # symbol arrives uppercased from the Arrow reader
+        df['symbol'] = df['symbol'].astype('string')
+        for col in ('price', 'market_cap', 'volume'):
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+        df = df.dropna(subset=['coin_id', 'name', 'symbol'])
+
+        self.records_failed += total - len(df)
+        self.records_processed += len(df)
+
+        if df.empty:
+            return
+
+        # NaN -> None so numeric gaps land as SQL NULLs
+        records = df.astype(object).where(df.notna(), None).to_dict('records')
+
+        store_raw = settings.store_raw_payload
+        # Generator: rows stream into the COPY buffer without a second
+        # list of per-row dicts alongside records
+        raw_rows = ({**item, "raw_data": item if store_raw else None} for item in records)
+        unified_rows = [{
+            "coin_id": item["coin_id"],
+            "name": item["name"],
+            "symbol": item["symbol"],
+            "price_usd": item["price"],
+            "market_cap_usd": item["market_cap"],
+            "volume_24h_usd": item["volume"],
+            "price_change_24h_percent": None,
+            "rank": None,
+            "source": "csv",
+            "source_updated_at": now,
+            "updated_at": now
+        } for item in records]
+
+        self.bulk_load(raw_rows, unified_rows)
+
+    def load_chunk_validated(self, chunk: pd.DataFrame):
+        """Per-row Pydantic validation slow path"""
+        now = datetime.now(timezone.utc)
+        store_raw = settings.store_raw_payload
+        raw_rows = []
+        unified_rows = []
+        data = chunk.to_dict('records')
+
         for item in data:
             try:
                 # Validate with Pydantic
                 validated = CSVSchema(**item)
-                
-                # Store raw data
-                raw_record = RawCSV(
-                    coin_id=validated.coin_id,
-                    name=validated.name,
-                    symbol=validated.symbol,
-                    price=validated.price,
-                    market_cap=validated.market_cap,
-                    volume=validated.volume,
-                    raw_data=item
-                )
-                self.db.add(raw_record)
-                
-                # Transform to unified schema
-                unified = UnifiedCrypto(
-                    coin_id=validated.coin_id,
-                    name=validated.name,
-                    symbol=validated.symbol.upper(),
-                    price_usd=validated.price,
-                    market_cap_usd=validated.market_cap,
-                    volume_24h_usd=validated.volume,
-                    price_change_24h_percent=None,
-                    rank=None,
-                    source="csv",
-                    source_updated_at=datetime.utcnow()
-                )
-                
-                # Check if record exists (upsert logic)
-                existing = self.db.query(UnifiedCrypto).filter(
-                    UnifiedCrypto.coin_id == validated.coin_id,
-                    UnifiedCrypto.source == "csv"
-                ).first()
-                
-                if existing:
-                    existing.price_usd = unified.price_usd
-                    existing.market_cap_usd = unified.market_cap_usd
-                    existing.volume_24h_usd = unified.volume_24h_usd
-                    existing.source_updated_at = unified.source_updated_at
-                    existing.updated_at = datetime.utcnow()
-                else:
-                    self.db.add(unified)
-                
+
+                raw_rows.append({
+                    "coin_id": validated.coin_id,
+                    "name": validated.name,
+                    "symbol": validated.symbol,
+                    "price": validated.price,
+                    "market_cap": validated.market_cap,
+                    "volume": validated.volume,
+                    "raw_data": item if store_raw else None
+                })
+
+                unified_rows.append({
+                    "coin_id": validated.coin_id,
+                    "name": validated.name,
+                    "symbol": validated.symbol.upper(),
+                    "price_usd": validated.price,
+                    "market_cap_usd": validated.market_cap,
+                    "volume_24h_usd": validated.volume,
+                    "price_change_24h_percent": None,
+                    "rank": None,
+                    "source": "csv",
+                    "source_updated_at": now,
+                    "updated_at": now
+                })
+
                 self.records_processed += 1
-                
+
             except Exception as e:
                 logger.error(f"Failed to process CSV record: {str(e)}", extra={
                     "coin_id": item.get("coin_id"),
@@ -110,6 +190,30 @@ class CSVIngestion(BaseIngestion):
                 })
                 self.records_failed += 1
                 continue
-        
-        self.db.commit()
-        logger.info(f"CSV ingestion completed: {self.records_processed} processed, {self.records_failed} failed")
+
+        self.bulk_load(raw_rows, unified_rows)
+
+    def bulk_load(self, raw_rows: Iterable[dict], unified_rows: List[dict]):
+        """Bulk insert raw rows and upsert unified rows in one commit"""
+        try:
+            if unified_rows:
+                # COPY the append-only raw table (bypasses SQL parsing;
+                # ~10x over batched INSERTs on large files), then upsert
+                # the unified table in one INSERT ... ON CONFLICT
+                # instead of per-row SELECT+UPDATE
+                self.copy_rows(RawCSV.__tablename__, RAW_CSV_COLUMNS, raw_rows)
+
+                self.bulk_upsert(
+                    UnifiedCrypto, unified_rows,
+                    conflict_cols=["coin_id", "source"],
+                    update_cols=[
+                        "name", "symbol", "price_usd", "market_cap_usd",
+                        "volume_24h_usd", "source_updated_at", "updated_at"
+                    ]
+                )
+
+            self.db.commit()
+        except Exception:
+            # Leave the session clean for the failure-path bookkeeping
+            self.db.rollback()
+            raise
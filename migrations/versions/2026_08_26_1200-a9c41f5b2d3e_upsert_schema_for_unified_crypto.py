@@ -0,0 +1,99 @@
+"""Upsert schema for unified_crypto
+
+Upgrades databases created before the bulk ON CONFLICT upsert path:
+the batched INSERT ... ON CONFLICT (coin_id, source) needs a unique
+constraint, but the baseline schema only had the non-unique
+idx_unified_coin_source. Dedupes existing rows, installs the
+constraint, drops the superseded indexes, and adds the covering
+listing index used by /data.
+
+Every step checks the live schema first, so the revision is a no-op
+both on fresh databases (docker-compose runs `alembic upgrade head`
+before `python -m core.init_db` creates the tables) and on databases
+already created from the current models.
+
+Revision ID: a9c41f5b2d3e
+Revises:
+Create Date: 2026-08-26 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c41f5b2d3e'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if 'unified_crypto' not in inspector.get_table_names():
+        # Fresh database: core.init_db creates the current schema,
+        # unique constraint and all
+        return
+
+    constraints = {
+        c['name'] for c in inspector.get_unique_constraints('unified_crypto')
+    }
+    indexes = {i['name'] for i in inspector.get_indexes('unified_crypto')}
+
+    if 'uq_unified_coin_source' not in constraints:
+        # Keep the most recently inserted row per (coin_id, source);
+        # duplicates can only exist from before the constraint
+        op.execute(
+            "DELETE FROM unified_crypto a "
+            "USING unified_crypto b "
+            "WHERE a.coin_id = b.coin_id "
+            "AND a.source = b.source "
+            "AND a.id < b.id"
+        )
+        op.create_unique_constraint(
+            'uq_unified_coin_source', 'unified_crypto', ['coin_id', 'source']
+        )
+
+    # Superseded by the unique constraint's backing index
+    for name in ('idx_unified_coin_source', 'ix_unified_crypto_coin_id'):
+        if name in indexes:
+            op.drop_index(name, table_name='unified_crypto')
+
+    # Baseline duplicate of idx_unified_symbol
+    if 'ix_unified_crypto_symbol' in indexes:
+        op.drop_index('ix_unified_crypto_symbol', table_name='unified_crypto')
+
+    if 'idx_unified_listing' not in indexes:
+        op.create_index(
+            'idx_unified_listing', 'unified_crypto',
+            [sa.text('updated_at DESC'), sa.text('id DESC')],
+            postgresql_include=[
+                'coin_id', 'symbol', 'source', 'price_usd', 'market_cap_usd',
+                'volume_24h_usd', 'price_change_24h_percent', 'name', 'rank'
+            ]
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if 'unified_crypto' not in inspector.get_table_names():
+        return
+
+    indexes = {i['name'] for i in inspector.get_indexes('unified_crypto')}
+
+    if 'idx_unified_listing' in indexes:
+        op.drop_index('idx_unified_listing', table_name='unified_crypto')
+    op.drop_constraint(
+        'uq_unified_coin_source', 'unified_crypto', type_='unique'
+    )
+    op.create_index(
+        'idx_unified_coin_source', 'unified_crypto', ['coin_id', 'source']
+    )
+    op.create_index(
+        'ix_unified_crypto_coin_id', 'unified_crypto', ['coin_id']
+    )
+    op.create_index(
+        'ix_unified_crypto_symbol', 'unified_crypto', ['symbol']
+    )
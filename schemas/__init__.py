@@ -2,6 +2,9 @@ from schemas.crypto import (
     CoinPaprikaSchema,
     CoinGeckoSchema,
     CSVSchema,
+    CoinPaprikaListAdapter,
+    CoinGeckoListAdapter,
+    CSVListAdapter,
     UnifiedCryptoSchema,
     CryptoResponse,
     DataResponse,
@@ -14,6 +17,9 @@ __all__ = [
     'CoinPaprikaSchema',
     'CoinGeckoSchema',
     'CSVSchema',
+    'CoinPaprikaListAdapter',
+    'CoinGeckoListAdapter',
+    'CSVListAdapter',
     'UnifiedCryptoSchema',
     'CryptoResponse',
     'DataResponse',
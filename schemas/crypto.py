@@ -1,10 +1,12 @@
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, field_validator
 from typing import Optional, Any
 from datetime import datetime
 
 
 class CoinPaprikaSchema(BaseModel):
     """Schema for CoinPaprika API data"""
+    model_config = ConfigDict(populate_by_name=True, extra='ignore', str_strip_whitespace=True)
+
     coin_id: str = Field(..., alias="id")
     name: str
     symbol: str
@@ -23,13 +25,12 @@ class CoinPaprikaSchema(BaseModel):
             return float(v)
         except (ValueError, TypeError):
             return None
-    
-    class Config:
-        populate_by_name = True
 
 
 class CoinGeckoSchema(BaseModel):
     """Schema for CoinGecko API data"""
+    model_config = ConfigDict(populate_by_name=True, extra='ignore', str_strip_whitespace=True)
+
     coin_id: str = Field(..., alias="id")
     name: str
     symbol: str
@@ -48,13 +49,12 @@ class CoinGeckoSchema(BaseModel):
             return float(v)
         except (ValueError, TypeError):
             return None
-    
-    class Config:
-        populate_by_name = True
 
 
 class CSVSchema(BaseModel):
     """Schema for CSV data"""
+    model_config = ConfigDict(extra='ignore', str_strip_whitespace=True)
+
     coin_id: str
     name: str
     symbol: str
@@ -73,6 +73,13 @@ class CSVSchema(BaseModel):
             return None
 
 
+# List adapters compiled once at import; validate whole batches in a
+# single C-level call instead of one model instantiation per row
+CoinPaprikaListAdapter = TypeAdapter(list[CoinPaprikaSchema])
+CoinGeckoListAdapter = TypeAdapter(list[CoinGeckoSchema])
+CSVListAdapter = TypeAdapter(list[CSVSchema])
+
+
 class UnifiedCryptoSchema(BaseModel):
     """Unified schema for all cryptocurrency data"""
     coin_id: str
@@ -108,9 +115,10 @@ class CryptoResponse(BaseModel):
 class DataResponse(BaseModel):
     """Paginated data response"""
     data: list[CryptoResponse]
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
     request_id: str
     api_latency_ms: float
 
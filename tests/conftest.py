@@ -1,32 +1,103 @@
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
-from core.database import Base
+from sqlalchemy.pool import StaticPool
+from api.main import app, count_cache, status_cache
+from core.database import Base, get_db
 from core.models import *
+from ingestion.base import BaseIngestion
 import os
 
-# Test database URL
-TEST_DATABASE_URL = "postgresql://kasparro:kasparro_pass@db:5432/kasparro_test_db"
 
+@pytest.fixture(scope="session")
+def test_engine():
+    """In-memory SQLite engine shared by the whole test session
 
-@pytest.fixture(scope="function")
-def test_db():
-    """Create a test database session"""
-    engine = create_engine(TEST_DATABASE_URL)
-    
-    # Create tables
+    StaticPool pins the single in-memory connection so every session
+    sees the same database; the pragmas drop the fsync-on-commit cost
+    that dominated the old file/Postgres-backed fixture. Session scope
+    is per-process, so each pytest-xdist worker builds its own engine
+    and workers never share state (run with -n auto --dist loadgroup).
+    """
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+        # Roomy compiled-SQL cache so repeated statements never recompile
+        query_cache_size=1200
+    )
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_conn, connection_record):
+        # pysqlite's implicit transactions break SAVEPOINT; take over
+        # transaction control so the per-test savepoints hold
+        dbapi_conn.isolation_level = None
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("PRAGMA journal_mode=MEMORY")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def do_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    # Create tables once per session instead of create/drop per test
     Base.metadata.create_all(bind=engine)
-    
-    # Create session
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def test_db(test_engine):
+    """Create a test database session
+
+    Each test runs inside an outer transaction that is rolled back on
+    teardown; commits inside the test land on SAVEPOINTs, so tests stay
+    isolated without re-creating the schema.
+    """
+    connection = test_engine.connect()
+    transaction = connection.begin()
+    TestingSessionLocal = sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=connection,
+        join_transaction_mode="create_savepoint"
+    )
     db = TestingSessionLocal()
-    
+
+    # Checkpoint rows cached by a previous test belong to rolled-back state
+    BaseIngestion._ckpt_cache.clear()
+
     try:
         yield db
     finally:
         db.close()
-        # Drop all tables after test
-        Base.metadata.drop_all(bind=engine)
+        transaction.rollback()
+        connection.close()
+
+
+@pytest.fixture(autouse=True)
+def wire_app_db(test_db):
+    """Route API requests through the fixture session
+
+    The app's get_db dependency is bound to the production engine;
+    without the override, TestClient requests could never see rows
+    inserted through test_db. The module-level response caches are
+    cleared too, so cached /health, /stats, and filtered-count
+    responses cannot leak rolled-back state into the next test.
+    """
+    def get_test_db():
+        yield test_db
+
+    app.dependency_overrides[get_db] = get_test_db
+    status_cache.clear()
+    count_cache.clear()
+    try:
+        yield
+    finally:
+        app.dependency_overrides.pop(get_db, None)
 
 
 @pytest.fixture
@@ -62,6 +62,39 @@ class TestAPIEndpoints:
         assert len(data["data"]) == 10
         assert data["page"] == 2
     
+    def test_data_endpoint_cursor_walk(self, test_db):
+        """Test cursor pagination visits every row exactly once"""
+        # Add sample data
+        for i in range(25):
+            crypto = UnifiedCrypto(
+                coin_id=f"coin_{i}",
+                name=f"Coin {i}",
+                symbol=f"C{i}",
+                price_usd=100.0 + i,
+                source="test"
+            )
+            test_db.add(crypto)
+        test_db.commit()
+
+        # Walk the pages via next_cursor (3 pages of 10/10/5)
+        seen = []
+        cursor = None
+        for _ in range(4):
+            url = "/data?page_size=10"
+            if cursor:
+                url += f"&cursor={cursor}"
+            response = client.get(url)
+            assert response.status_code == 200
+            data = response.json()
+            seen.extend(item["coin_id"] for item in data["data"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+
+        assert cursor is None
+        assert len(seen) == 25
+        assert len(set(seen)) == 25  # no duplicates across pages
+
     def test_data_endpoint_filtering(self, test_db):
         """Test data endpoint with filtering"""
         # Add sample data
@@ -172,6 +205,16 @@ class TestAPIErrorHandling:
         response = client.get("/data?page_size=200")
         assert response.status_code == 422  # Exceeds max
     
+    def test_data_endpoint_invalid_cursor(self):
+        """Test data endpoint rejects malformed cursors with 422"""
+        # Not base64 at all
+        response = client.get("/data?cursor=%%%garbage")
+        assert response.status_code == 422
+
+        # Valid base64, wrong payload shape ("not-a-cursor")
+        response = client.get("/data?cursor=bm90LWEtY3Vyc29y")
+        assert response.status_code == 422
+
     def test_data_endpoint_invalid_filter(self):
         """Test data endpoint with invalid filter"""
         response = client.get("/data?source=invalid_source")
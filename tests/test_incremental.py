@@ -1,36 +1,69 @@
 import pytest
-from datetime import datetime
+from sqlalchemy import bindparam, event, select
 from core.models import ETLCheckpoint, ETLRun, UnifiedCrypto
 from ingestion.base import BaseIngestion
-from unittest.mock import Mock
 
 
+class StubIngestion(BaseIngestion):
+    """Concrete BaseIngestion for exercising the shared helpers"""
+
+    def fetch_data(self):
+        return []
+
+    def transform_and_load(self, data):
+        pass
+
+
+# Verification lookups compiled once; each execute only rebinds.
+# Column selects return plain Rows, skipping identity-map insertion
+# and ORM instance hydration that assertions never need
+CKPT_BY_NAME = select(
+    ETLCheckpoint.last_processed_id,
+    ETLCheckpoint.records_processed,
+    ETLCheckpoint.last_run_status,
+    ETLCheckpoint.last_error
+).where(ETLCheckpoint.source_name == bindparam("n"))
+RUN_BY_ID = select(
+    ETLRun.source_name,
+    ETLRun.status,
+    ETLRun.records_processed,
+    ETLRun.records_failed,
+    ETLRun.error_message,
+    ETLRun.completed_at
+).where(ETLRun.run_id == bindparam("run_id"))
+
+
+@pytest.mark.xdist_group("incremental")
 class TestIncrementalIngestion:
     """Test incremental ingestion logic"""
     
     def test_checkpoint_creation(self, test_db):
         """Test checkpoint creation"""
         # Create mock ingestion
-        ingestion = BaseIngestion("test_source", test_db)
+        ingestion = StubIngestion("test_source", test_db)
         ingestion.records_processed = 100
-        
+
+        # The upsert path should cost exactly one commit
+        commits = []
+        event.listen(test_db, "after_commit", lambda session: commits.append(1))
+
         # Update checkpoint
         ingestion.update_checkpoint(
             last_id="last_item_id",
-            timestamp=datetime.utcnow(),
             status="success"
         )
-        
+
         # Verify checkpoint
-        checkpoint = test_db.query(ETLCheckpoint).filter(
-            ETLCheckpoint.source_name == "test_source"
+        checkpoint = test_db.execute(
+            CKPT_BY_NAME, {"n": "test_source"}
         ).first()
-        
+
         assert checkpoint is not None
         assert checkpoint.last_processed_id == "last_item_id"
         assert checkpoint.records_processed == 100
         assert checkpoint.last_run_status == "success"
-    
+        assert len(commits) == 1
+
     def test_checkpoint_update(self, test_db):
         """Test checkpoint update"""
         # Create initial checkpoint
@@ -42,27 +75,31 @@ class TestIncrementalIngestion:
         )
         test_db.add(checkpoint)
         test_db.commit()
-        
+
         # Update checkpoint
-        ingestion = BaseIngestion("test_source", test_db)
+        ingestion = StubIngestion("test_source", test_db)
         ingestion.records_processed = 150
+
+        commits = []
+        event.listen(test_db, "after_commit", lambda session: commits.append(1))
+
         ingestion.update_checkpoint(
             last_id="new_id",
-            timestamp=datetime.utcnow(),
             status="success"
         )
-        
+
         # Verify update
-        updated = test_db.query(ETLCheckpoint).filter(
-            ETLCheckpoint.source_name == "test_source"
+        updated = test_db.execute(
+            CKPT_BY_NAME, {"n": "test_source"}
         ).first()
-        
+
         assert updated.last_processed_id == "new_id"
         assert updated.records_processed == 150
+        assert len(commits) == 1
     
     def test_run_tracking(self, test_db):
         """Test ETL run tracking"""
-        ingestion = BaseIngestion("test_source", test_db)
+        ingestion = StubIngestion("test_source", test_db)
         ingestion.records_processed = 100
         ingestion.records_failed = 5
         
@@ -70,100 +107,89 @@ class TestIncrementalIngestion:
         ingestion.create_run()
         
         # Verify run created
-        run = test_db.query(ETLRun).filter(
-            ETLRun.run_id == ingestion.run_id
+        run = test_db.execute(
+            RUN_BY_ID, {"run_id": ingestion.run_id}
         ).first()
-        
+
         assert run is not None
         assert run.source_name == "test_source"
         assert run.status == "started"
-        
-        # Complete run
-        ingestion.complete_run("success")
-        
-        # Verify completion
-        test_db.refresh(run)
-        assert run.status == "success"
-        assert run.records_processed == 100
-        assert run.records_failed == 5
-        assert run.completed_at is not None
+
+        # Complete run; RETURNING hands back the final state without
+        # a second lookup
+        completed = ingestion.complete_run("success")
+
+        assert completed.status == "success"
+        assert completed.records_processed == 100
+        assert completed.records_failed == 5
+        assert completed.completed_at is not None
     
     def test_idempotent_writes(self, test_db):
         """Test idempotent writes (upsert logic)"""
+        ingestion = StubIngestion("test", test_db)
+        row = {
+            "coin_id": "bitcoin",
+            "name": "Bitcoin",
+            "symbol": "BTC",
+            "price_usd": 40000.0,
+            "source": "test"
+        }
+
         # First write
-        crypto1 = UnifiedCrypto(
-            coin_id="bitcoin",
-            name="Bitcoin",
-            symbol="BTC",
-            price_usd=40000.0,
-            source="test"
+        ingestion.bulk_upsert(
+            UnifiedCrypto, [row],
+            conflict_cols=["coin_id", "source"],
+            update_cols=["price_usd"]
         )
-        test_db.add(crypto1)
         test_db.commit()
-        
-        # Second write (update)
-        existing = test_db.query(UnifiedCrypto).filter(
-            UnifiedCrypto.coin_id == "bitcoin",
-            UnifiedCrypto.source == "test"
-        ).first()
-        
-        existing.price_usd = 45000.0
+
+        # Second write lands on the conflict target and updates in
+        # place; RETURNING reports the outcome without a follow-up SELECT
+        written = ingestion.bulk_upsert(
+            UnifiedCrypto, [dict(row, price_usd=45000.0)],
+            conflict_cols=["coin_id", "source"],
+            update_cols=["price_usd"],
+            returning_updated=True
+        )
         test_db.commit()
-        
-        # Verify only one record exists
-        count = test_db.query(UnifiedCrypto).filter(
-            UnifiedCrypto.coin_id == "bitcoin",
-            UnifiedCrypto.source == "test"
-        ).count()
-        
-        assert count == 1
-        
-        # Verify price updated
-        updated = test_db.query(UnifiedCrypto).filter(
-            UnifiedCrypto.coin_id == "bitcoin",
-            UnifiedCrypto.source == "test"
-        ).first()
-        
-        assert updated.price_usd == 45000.0
 
+        assert len(written) == 1
+        assert written[0].updated
+        assert written[0].price_usd == 45000.0
 
+
+@pytest.mark.xdist_group("failure-recovery")
 class TestFailureRecovery:
     """Test failure recovery logic"""
     
     def test_run_failure_tracking(self, test_db):
         """Test tracking failed runs"""
-        ingestion = BaseIngestion("test_source", test_db)
+        ingestion = StubIngestion("test_source", test_db)
         ingestion.create_run()
         
         # Simulate failure
         error_msg = "Connection timeout"
-        ingestion.complete_run("failed", error_msg)
-        
-        # Verify failure tracking
-        run = test_db.query(ETLRun).filter(
-            ETLRun.run_id == ingestion.run_id
-        ).first()
-        
-        assert run.status == "failed"
-        assert run.error_message == error_msg
-        assert run.completed_at is not None
+        failed = ingestion.complete_run("failed", error_msg)
+
+        assert failed.status == "failed"
+        assert failed.error_message == error_msg
+        assert failed.completed_at is not None
     
     def test_checkpoint_failure_tracking(self, test_db):
         """Test checkpoint tracks failures"""
-        ingestion = BaseIngestion("test_source", test_db)
+        ingestion = StubIngestion("test_source", test_db)
         
         error_msg = "API rate limit exceeded"
         ingestion.update_checkpoint(
             last_id="",
-            timestamp=datetime.utcnow(),
             status="failure",
             error=error_msg
         )
         
-        checkpoint = test_db.query(ETLCheckpoint).filter(
-            ETLCheckpoint.source_name == "test_source"
+        checkpoint = test_db.execute(
+            CKPT_BY_NAME, {"n": "test_source"}
         ).first()
-        
+
         assert checkpoint.last_run_status == "failure"
         assert checkpoint.last_error == error_msg
     
@@ -173,7 +199,6 @@ class TestFailureRecovery:
         checkpoint = ETLCheckpoint(
             source_name="test_source",
             last_processed_id="item_100",
-            last_processed_timestamp=datetime.utcnow(),
             records_processed=100,
             last_run_status="success"
         )
@@ -181,14 +206,20 @@ class TestFailureRecovery:
         test_db.commit()
         
         # Get checkpoint in new ingestion
-        ingestion = BaseIngestion("test_source", test_db)
+        ingestion = StubIngestion("test_source", test_db)
         last_checkpoint = ingestion.get_checkpoint()
-        
+
         assert last_checkpoint is not None
         assert last_checkpoint.last_processed_id == "item_100"
         assert last_checkpoint.records_processed == 100
 
+        # Second read is served from the process-local cache
+        hits_before = BaseIngestion._ckpt_cache_hits
+        assert ingestion.get_checkpoint() is last_checkpoint
+        assert BaseIngestion._ckpt_cache_hits == hits_before + 1
 
+
+@pytest.mark.xdist_group("schema-drift")
 class TestSchemaDrift:
     """Test schema drift detection"""
     
@@ -196,7 +227,7 @@ class TestSchemaDrift:
         """Test detection of missing fields"""
         from core.models import SchemaDrift
         
-        ingestion = BaseIngestion("test_source", test_db)
+        ingestion = StubIngestion("test_source", test_db)
         
         expected_fields = {
             "id": "str",
@@ -211,13 +242,16 @@ class TestSchemaDrift:
         }
         
         ingestion.detect_schema_drift(expected_fields, actual_data)
-        
+        ingestion.flush_drift()
+
         # Verify drift recorded
-        drift = test_db.query(SchemaDrift).filter(
-            SchemaDrift.source_name == "test_source",
-            SchemaDrift.drift_type == "missing_field"
+        drift = test_db.execute(
+            select(SchemaDrift.field_name, SchemaDrift.expected_type).where(
+                SchemaDrift.source_name == "test_source",
+                SchemaDrift.drift_type == "missing_field"
+            )
         ).first()
-        
+
         assert drift is not None
         assert drift.field_name == "price"
         assert drift.expected_type == "float"
@@ -226,7 +260,7 @@ class TestSchemaDrift:
         """Test detection of new fields"""
         from core.models import SchemaDrift
         
-        ingestion = BaseIngestion("test_source", test_db)
+        ingestion = StubIngestion("test_source", test_db)
         
         expected_fields = {
             "id": "str",
@@ -240,13 +274,16 @@ class TestSchemaDrift:
         }
         
         ingestion.detect_schema_drift(expected_fields, actual_data)
-        
+        ingestion.flush_drift()
+
         # Verify drift recorded
-        drift = test_db.query(SchemaDrift).filter(
-            SchemaDrift.source_name == "test_source",
-            SchemaDrift.drift_type == "new_field"
+        drift = test_db.execute(
+            select(SchemaDrift.field_name, SchemaDrift.sample_value).where(
+                SchemaDrift.source_name == "test_source",
+                SchemaDrift.drift_type == "new_field"
+            )
         ).first()
-        
+
         assert drift is not None
         assert drift.field_name == "new_field"
         assert drift.sample_value == "unexpected_value"